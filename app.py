@@ -1,17 +1,169 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-import matplotlib.pyplot as plt
 from io import BytesIO
-from matplotlib.patches import FancyBboxPatch
-import json
+from PIL import Image, ImageDraw, ImageFont
+import orjson
+import os
+
+# --- Persona lookups ---
+color_map = {
+    "🧠 Generalist": "#888888",
+    "🗣️ NLP Specialist": "#FFB347",
+    "📊 EDA-Focused": "#4CAF50",
+    "👁️ CV Enthusiast": "#2196F3",
+    "🤖 ML Practitioner": "#9C27B0",
+    "🧬 DL Researcher": "#E91E63",
+    "📈 Time-Series Analyst": "#FF5722"
+}
+
+persona_explainer = {
+    "🧠 Generalist": "Contributes across multiple domains with balanced focus.",
+    "🗣️ NLP Specialist": "Strong focus on text and language-related projects.",
+    "📊 EDA-Focused": "Excels in data storytelling and visual exploration.",
+    "👁️ CV Enthusiast": "Loves building computer vision models and image tasks.",
+    "🤖 ML Practitioner": "Works across classic ML problems and solutions.",
+    "🧬 DL Researcher": "Deep learning-focused notebooks and innovations.",
+    "📈 Time-Series Analyst": "Specialist in trend-based time-driven datasets."
+}
+
+# Personas are identified by their 2-char emoji prefix
+PREFIX_TABLE = {k[:2]: (v, persona_explainer[k]) for k, v in color_map.items()}
+
+
+def get_persona_badge(persona):
+    color, _ = PREFIX_TABLE.get(persona[:2], ('#888', ''))
+    return f"<span style='background-color:{color}; color:white; padding:4px 8px; border-radius:8px;'>{persona}</span>"
+
+
+# --- Persona card (PNG) ---
+# Minimum canvas; it grows to fit long lines like the old bbox_inches='tight'
+CARD_SIZE = (700, 500)
+CARD_PADDING = 30
+CARD_SPACING = 8
+try:
+    CARD_FONT = ImageFont.truetype('DejaVuSansMono.ttf', 17)
+except OSError:
+    CARD_FONT = ImageFont.load_default(size=17)
+
+
+# str.translate table that keeps only alphanumerics and whitespace,
+# filled in per code point on first use instead of covering all of Unicode
+class _CardTextTable(dict):
+    def __missing__(self, cp):
+        c = chr(cp)
+        self[cp] = cp if c.isalnum() or c.isspace() else None
+        return self[cp]
+
+
+_CARD_TEXT_TABLE = _CardTextTable()
+
+# --- Charts ---
+# Shared layout for the plain go.* bar/timeline figures
+CHART_LAYOUT = go.Layout(template='plotly', showlegend=False)
+
+# --- Styles ---
+# Static CSS for the HTML persona card, kept out of the per-user f-string
+STATIC_CSS = """
+    <style>
+        .card {
+            background: rgba(30, 30, 30, 0.6);
+            border: 1px solid rgba(255, 255, 255, 0.15);
+            border-radius: 15px;
+            padding: 25px;
+            color: #fff;
+            font-family: 'Segoe UI', sans-serif;
+            box-shadow: 0 0 20px rgba(0, 255, 255, 0.4);
+            backdrop-filter: blur(10px);
+            margin-top: 40px;
+        }
+        .card h2 {
+            font-size: 26px;
+            background: linear-gradient(to right, #00fff0, #00d2ff);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            margin-bottom: 10px;
+        }
+        .card p {
+            font-size: 17px;
+            margin: 6px 0;
+        }
+        .badge {
+            display: inline-block;
+            background: linear-gradient(to right, #ff00cc, #3333ff);
+            padding: 6px 12px;
+            border-radius: 12px;
+            font-weight: bold;
+            color: white;
+            box-shadow: 0 0 10px rgba(255, 0, 255, 0.6);
+            margin-bottom: 12px;
+        }
+    </style>
+"""
 
 # --- Page config ---
 st.set_page_config(layout="wide")
 
 # --- Load data ---
-df = pd.read_csv('./data/full_user_profiles_with_persona.csv')
+PROFILES_CSV = './data/full_user_profiles_with_persona.csv'
+PROFILES_PARQUET = './data/full_user_profiles_with_persona.parquet'
+TIMELINE_CSV = './data/user_timeline.csv'
+
+# Only the columns the app actually reads
+PROFILE_COLUMNS = [
+    'AuthorUserId', 'Persona', 'GoldMedals', 'SilverMedals', 'BronzeMedals',
+    'MostVotedNotebook', 'MostVotes', 'MostActiveMonth', 'AvgNotebookLength',
+    'TotalNotebooks', 'TotalViews', 'TotalVotes',
+    'cv', 'dl', 'eda', 'ml', 'nlp', 'other', 'time_series', 'RecommendedTopics'
+]
+
+topic_cols = ['cv', 'dl', 'eda', 'ml', 'nlp', 'other', 'time_series']
+# Radar chart shares, including 'other' (unlike the CSV's own *_pct columns)
+topic_pct_cols = [f'_{c}_pct' for c in topic_cols]
+
+# Known column types, so pandas skips inference and stores narrower numbers
+PROFILE_DTYPES = {
+    'AuthorUserId': str,
+    'GoldMedals': 'int32', 'SilverMedals': 'int32', 'BronzeMedals': 'int32',
+    'TotalNotebooks': 'int32', 'TotalViews': 'int32', 'TotalVotes': 'int32',
+    # AvgNotebookLength stays float64 so the JSON export keeps its exact value
+    'AvgNotebookLength': 'float64',
+    **{c: 'float32' for c in topic_cols}
+}
+
+
+# mtime is only part of the cache key, so edited or re-converted files are
+# reloaded; max_entries=1 drops the stale copy
+@st.cache_data(max_entries=1)
+def load_profiles(path, mtime):
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path, columns=PROFILE_COLUMNS).astype(PROFILE_DTYPES)
+    else:
+        df = pd.read_csv(path, usecols=PROFILE_COLUMNS, dtype=PROFILE_DTYPES)
+    # Lowercased search column, built once instead of on every keystroke
+    df['_uid_str'] = df['AuthorUserId'].str.lower()
+    topic_total = df[topic_cols].sum(axis=1).replace(0, 1)
+    df[topic_pct_cols] = df[topic_cols].div(topic_total, axis=0).mul(100).round(2).to_numpy()
+    # Only a handful of distinct personas, so render each badge once and share it
+    badges = {p: get_persona_badge(p) for p in df['Persona'].dropna().unique()}
+    df['_badge_html'] = df['Persona'].map(badges).astype('category')
+    # AuthorUserId is unique, so index on it for direct row lookups
+    return df.set_index('AuthorUserId', drop=False)
+
+
+@st.cache_data(max_entries=1)
+def load_timeline(path, mtime):
+    timeline_df = pd.read_csv(path)
+    timeline_df['AuthorUserId'] = timeline_df['AuthorUserId'].astype(str)
+    # Sorted index so per-user lookups are a slice, not a full scan (stable keeps month order)
+    return timeline_df.set_index('AuthorUserId').sort_index(kind='stable')
+
+
+# Prefer the Parquet copy (see convert_to_parquet.py), fall back to the CSV
+profiles_path = PROFILES_PARQUET if os.path.exists(PROFILES_PARQUET) else PROFILES_CSV
+# Passed to the caches that read the global df, so they expire with it
+profiles_mtime = os.path.getmtime(profiles_path)
+df = load_profiles(profiles_path, profiles_mtime)
 
 st.title("Kaggle Persona Analyzer 🔍")
 
@@ -27,94 +179,141 @@ with st.expander("📘 What is This App?"):
     """)
 
 # --- Select User ---
-search_term = st.text_input("🔎 Search User ID")
-filtered = df[df['AuthorUserId'].astype(str).str.contains(search_term, case=False)] if search_term else df.head(10)
+MAX_USER_OPTIONS = 50
+# Bound the per-user caches; any of the ~440k users can be selected
+USER_CACHE_ENTRIES = 256
 
-user_id = st.selectbox("Select User ID", filtered['AuthorUserId'].unique())
-user = filtered[filtered['AuthorUserId'] == user_id].iloc[0]
 
-medals = {
-    "🥇 Gold": user["GoldMedals"],
-    "🥈 Silver": user["SilverMedals"],
-    "🥉 Bronze": user["BronzeMedals"]
-}
+@st.cache_data(max_entries=100)
+def search_user_ids(search_term, profiles_mtime):
+    filtered = df[df['_uid_str'].str.contains(search_term.lower(), regex=False, na=False)] if search_term else df.head(10)
+    # The index is already unique; cap the options so broad matches stay responsive
+    return list(filtered.index[:MAX_USER_OPTIONS])
 
 
-# --- Functions ---
-def get_persona_badge(persona):
-    color_map = {
-        "🧠 Generalist": "#888888",
-        "🗣️ NLP Specialist": "#FFB347",
-        "📊 EDA-Focused": "#4CAF50",
-        "👁️ CV Enthusiast": "#2196F3",
-        "🤖 ML Practitioner": "#9C27B0",
-        "🧬 DL Researcher": "#E91E63",
-        "📈 Time-Series Analyst": "#FF5722"
-    }
-    for key, color in color_map.items():
-        if persona.startswith(key[:2]):
-            return f"<span style='background-color:{color}; color:white; padding:4px 8px; border-radius:8px;'>{persona}</span>"
-    return f"<span style='background-color:#888; color:white; padding:4px 8px; border-radius:8px;'>{persona}</span>"
+# Typing in the search box only reruns this fragment; the full page reruns
+# once the selected user actually changes
+@st.fragment
+def search_fragment():
+    search_term = st.text_input("🔎 Search User ID")
+    options = search_user_ids(search_term, profiles_mtime)
 
+    # Keep the current user selected while it is still among the matches
+    current = st.session_state.get('user_id')
+    index = options.index(current) if current in options else 0
+    user_id = st.selectbox("Select User ID", options, index=index)
+    if 'user_id' not in st.session_state:
+        st.session_state['user_id'] = user_id
+    elif user_id is not None and user_id != st.session_state['user_id']:
+        st.session_state['user_id'] = user_id
+        st.rerun()
 
-def create_persona_card(user):
-    fig, ax = plt.subplots(figsize=(7, 5))
-    ax.set_facecolor('#0D0D0D')
-    fig.patch.set_facecolor('#0D0D0D')
-    ax.axis('off')
 
-    # Neon border
-    rect = FancyBboxPatch((0, 0), 1, 1,
-                          boxstyle="round,pad=0.02",
-                          linewidth=2,
-                          edgecolor='#00FFFF',
-                          facecolor='none',
-                          transform=ax.transAxes,
-                          zorder=10)
-    ax.add_patch(rect)
-
-    # Emoji-free version to avoid glyph warnings
-    persona_clean = ''.join([c for c in user['Persona'] if c.isalnum() or c.isspace()])
+search_fragment()
+user_id = st.session_state['user_id']
+user = df.loc[user_id]
+
+
+# --- Functions ---
+@st.cache_data(max_entries=USER_CACHE_ENTRIES)
+def _render_card(uid, persona, nb, votes, month, avg_len, total_nb, views, total_votes) -> bytes:
+    # Emoji-free version to avoid missing glyphs
+    persona_clean = persona.translate(_CARD_TEXT_TABLE)
 
     text = f"""
 KAGGLE PERSONA CARD
 
-USER ID: {user['AuthorUserId']}
+USER ID: {uid}
 PERSONA: {persona_clean}
-TOP NOTEBOOK: {user['MostVotedNotebook']} ({user['MostVotes']} votes)
-ACTIVE MONTH: {user['MostActiveMonth']}
-AVG LENGTH: {user['AvgNotebookLength']:.2f} cells
-NOTEBOOKS: {user['TotalNotebooks']}
-VIEWS: {user['TotalViews']}
-VOTES: {user['TotalVotes']}
+TOP NOTEBOOK: {nb} ({votes} votes)
+ACTIVE MONTH: {month}
+AVG LENGTH: {avg_len:.2f} cells
+NOTEBOOKS: {total_nb}
+VIEWS: {views}
+VOTES: {total_votes}
 """
 
-    ax.text(0.05, 0.95, text, fontsize=12, va='top', ha='left', color='white', family='monospace')
-    plt.tight_layout(pad=2)
+    # Measure the text first so long notebook titles are never cut off
+    measure = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+    _, _, right, bottom = measure.multiline_textbbox((CARD_PADDING, CARD_PADDING), text,
+                                                     font=CARD_FONT, spacing=CARD_SPACING)
+    width = max(CARD_SIZE[0], right + CARD_PADDING)
+    height = max(CARD_SIZE[1], bottom + CARD_PADDING)
 
+    img = Image.new('RGB', (width, height), '#0D0D0D')
+    draw = ImageDraw.Draw(img)
+
+    # Neon border
+    draw.rounded_rectangle((10, 10, width - 10, height - 10), radius=20, outline='#00FFFF', width=2)
+    draw.multiline_text((CARD_PADDING, CARD_PADDING), text, fill='white', font=CARD_FONT, spacing=CARD_SPACING)
+
+    # The card is mostly solid color, so cheap zlib compression costs little in size
     buf = BytesIO()
-    plt.savefig(buf, format="png", dpi=150, bbox_inches='tight', facecolor=fig.get_facecolor())
-    buf.seek(0)
-    return buf
+    img.save(buf, 'PNG', compress_level=1)
+    return buf.getvalue()
 
 
-# --- Persona Display ---
-st.markdown(f"### 🎭 Persona: {get_persona_badge(user['Persona'])}", unsafe_allow_html=True)
+def create_persona_card(user):
+    # Cache on the scalar fields the card shows rather than hashing the whole Series
+    card = _render_card(user['AuthorUserId'], user['Persona'], user['MostVotedNotebook'], user['MostVotes'],
+                        user['MostActiveMonth'], user['AvgNotebookLength'], user['TotalNotebooks'],
+                        user['TotalViews'], user['TotalVotes'])
+    return BytesIO(card)
+
+
+# Figures are cached per user on cheap scalar keys so reruns skip rebuilding them.
+# They are cached as plain dicts: st.cache_data pickles its values, and
+# unpickling a go.Figure re-runs the full Plotly validation
+@st.cache_data(max_entries=USER_CACHE_ENTRIES)
+def build_radar(uid, percentages):
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(r=list(percentages), theta=topic_cols, fill='toself', name='Topic Strength'))
+    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])), showlegend=False,
+                      title=dict(text="📊 Topic Strength Radar Chart", x=0.5))
+    return fig.to_dict()
+
+
+@st.cache_data(max_entries=USER_CACHE_ENTRIES)
+def build_medal_bar(uid, gold, silver, bronze):
+    medals = {
+        "🥇 Gold": gold,
+        "🥈 Silver": silver,
+        "🥉 Bronze": bronze
+    }
+    medal_fig = go.Figure(go.Bar(x=list(medals.keys()), y=list(medals.values())))
+    medal_fig.update_layout(CHART_LAYOUT)
+    medal_fig.update_layout(title_text="🏅 Medal Distribution", xaxis_title='Medal Type', yaxis_title='Count')
+    return medal_fig.to_dict()
+
+
+@st.cache_data(max_entries=USER_CACHE_ENTRIES)
+def build_timeline(uid, timeline_mtime):
+    timeline_df = load_timeline(TIMELINE_CSV, timeline_mtime)
+    try:
+        user_timeline = timeline_df.loc[[uid]]
+    except KeyError:
+        return None
+    timeline_fig = go.Figure(go.Scattergl(x=user_timeline['Month'], y=user_timeline['Count'], mode='lines+markers'))
+    timeline_fig.update_layout(CHART_LAYOUT)
+    timeline_fig.update_layout(title_text="🗓️ Notebook Activity Over Time", xaxis_title='Month', yaxis_title='Count')
+    return timeline_fig.to_dict()
+
+
+@st.cache_data(max_entries=USER_CACHE_ENTRIES)
+def build_export_json(uid, profiles_mtime) -> bytes:
+    # Leave out the app's derived (underscore) columns; orjson handles numpy scalars
+    export_data = df.loc[uid, PROFILE_COLUMNS].to_dict()
+    # Ids are kept as strings for searching; export them as the original integers
+    export_data['AuthorUserId'] = int(export_data['AuthorUserId'])
+    return orjson.dumps(export_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
 
-persona_explainer = {
-    "🧠 Generalist": "Contributes across multiple domains with balanced focus.",
-    "🗣️ NLP Specialist": "Strong focus on text and language-related projects.",
-    "📊 EDA-Focused": "Excels in data storytelling and visual exploration.",
-    "👁️ CV Enthusiast": "Loves building computer vision models and image tasks.",
-    "🤖 ML Practitioner": "Works across classic ML problems and solutions.",
-    "🧬 DL Researcher": "Deep learning-focused notebooks and innovations.",
-    "📈 Time-Series Analyst": "Specialist in trend-based time-driven datasets."
-}
 
-for key in persona_explainer:
-    if user["Persona"].startswith(key[:2]):
-        st.markdown(f"🧾 _{persona_explainer[key]}_")
-        break
+# --- Persona Display ---
+st.markdown(f"### 🎭 Persona: {user['_badge_html']}", unsafe_allow_html=True)
+
+_, exp = PREFIX_TABLE.get(user["Persona"][:2], (None, None))
+if exp:
+    st.markdown(f"🧾 _{exp}_")
 
 st.write(f"**Most Voted Notebook:** {user['MostVotedNotebook']} ({user['MostVotes']} votes)")
 st.write(f"**Most Active Month:** {user['MostActiveMonth']}")
@@ -132,20 +331,10 @@ col2.metric("👀 Total Views", int(user['TotalViews']))
 col3.metric("👍 Total Votes", int(user['TotalVotes']))
 
 # --- Radar Chart ---
-topic_cols = ['cv', 'dl', 'eda', 'ml', 'nlp', 'other', 'time_series']
-topic_values = [user[col] for col in topic_cols]
-total = sum(topic_values)
-percentages = [round((v / total) * 100, 2) if total > 0 else 0 for v in topic_values]
-
-fig = go.Figure()
-fig.add_trace(go.Scatterpolar(r=percentages, theta=topic_cols, fill='toself', name='Topic Strength'))
-fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])), showlegend=False,
-                  title=dict(text="📊 Topic Strength Radar Chart", x=0.5))
+fig = build_radar(user_id, tuple(user[topic_pct_cols]))
 
 # --- Medal Bar Chart ---
-medal_fig = px.bar(x=list(medals.keys()), y=list(medals.values()),
-                   labels={'x': 'Medal Type', 'y': 'Count'},
-                   title="🏅 Medal Distribution")
+medal_fig = build_medal_bar(user_id, user["GoldMedals"], user["SilverMedals"], user["BronzeMedals"])
 
 col1, col2 = st.columns(2)
 col1.plotly_chart(fig, use_container_width=True)
@@ -153,10 +342,8 @@ col2.plotly_chart(medal_fig, use_container_width=True)
 
 # --- Timeline Chart ---
 try:
-    timeline_df = pd.read_csv('./data/user_timeline.csv')
-    user_timeline = timeline_df[timeline_df['AuthorUserId'] == user_id]
-    if not user_timeline.empty:
-        timeline_fig = px.bar(user_timeline, x='Month', y='Count', title="🗓️ Notebook Activity Over Time")
+    timeline_fig = build_timeline(user_id, os.path.getmtime(TIMELINE_CSV))
+    if timeline_fig is not None:
         st.plotly_chart(timeline_fig, use_container_width=True)
     else:
         st.info("No timeline data available for this user.")
@@ -170,42 +357,9 @@ votes = user['MostVotes']
 month = user['MostActiveMonth']
 avg_len = f"{user['AvgNotebookLength']:.2f}"
 
-st.markdown(f"""
-    <style>
-        .card {{
-            background: rgba(30, 30, 30, 0.6);
-            border: 1px solid rgba(255, 255, 255, 0.15);
-            border-radius: 15px;
-            padding: 25px;
-            color: #fff;
-            font-family: 'Segoe UI', sans-serif;
-            box-shadow: 0 0 20px rgba(0, 255, 255, 0.4);
-            backdrop-filter: blur(10px);
-            margin-top: 40px;
-        }}
-        .card h2 {{
-            font-size: 26px;
-            background: linear-gradient(to right, #00fff0, #00d2ff);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            margin-bottom: 10px;
-        }}
-        .card p {{
-            font-size: 17px;
-            margin: 6px 0;
-        }}
-        .badge {{
-            display: inline-block;
-            background: linear-gradient(to right, #ff00cc, #3333ff);
-            padding: 6px 12px;
-            border-radius: 12px;
-            font-weight: bold;
-            color: white;
-            box-shadow: 0 0 10px rgba(255, 0, 255, 0.6);
-            margin-bottom: 12px;
-        }}
-    </style>
+st.markdown(STATIC_CSS, unsafe_allow_html=True)
 
+st.markdown(f"""
     <div class="card">
         <h2>🧬 Kaggle Persona Card</h2>
         <div class="badge">{persona}</div>
@@ -215,25 +369,29 @@ st.markdown(f"""
     </div>
 """, unsafe_allow_html=True)
 
+
 # --- Download Buttons ---
-if st.button("📥 Download PNG Persona Card"):
-    card = create_persona_card(user)
+# Clicking a download only reruns this fragment, not the whole page. The
+# files are only built when a download is actually clicked
+@st.fragment
+def download_fragment(user):
     st.download_button(
-        label="Download as PNG",
-        data=card,
+        label="📥 Download PNG Persona Card",
+        data=lambda: create_persona_card(user),
         file_name=f"persona_card_{user['AuthorUserId']}.png",
         mime="image/png"
     )
 
-if st.button("📤 Export Full User Stats as JSON"):
-    export_data = user.to_dict()
     st.download_button(
-        label="Download as JSON",
-        data=json.dumps(export_data, indent=2),
+        label="📤 Export Full User Stats as JSON",
+        data=lambda: build_export_json(user['AuthorUserId'], profiles_mtime),
         file_name=f"{user['AuthorUserId']}_persona_data.json",
         mime="application/json"
     )
 
+
+download_fragment(user)
+
 # --- Footer ---
 st.markdown("---")
 st.markdown("<center>🚀 Built by Thabasvini K & Team for the Meta Kaggle Hackathon 2025</center>", unsafe_allow_html=True)
@@ -0,0 +1,6 @@
+import pandas as pd
+
+# --- Convert user profiles CSV to Parquet (read by app.py when present) ---
+df = pd.read_csv('./data/full_user_profiles_with_persona.csv')
+df.to_parquet('./data/full_user_profiles_with_persona.parquet', compression='zstd')
+print(f"Wrote {len(df)} rows to ./data/full_user_profiles_with_persona.parquet")